@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Log analysis script for the AI Assistant Streamlit application.
+This script reconstructs sessions from app.log and reports rerun patterns.
+
+Every full script rerun logs "Starting AI Assistant application" followed by
+the view that was rendered, and widget handlers log events such as
+"User message: ..." or "API key updated". From these lines the script
+derives, per session, how often the app reruns, which views users switch
+between, bursts of rapid reruns ("rerun storms") and which widgets cause
+reruns that are immediately followed by another st.rerun().
+
+Widgets in the sidebar fragment rerun only the fragment, which logs
+"Rendering sidebar" and its handler's events but no start message. Every
+"Rendering sidebar" after the first one of a full rerun therefore starts a
+fragment rerun, which owns the events that follow it.
+
+The log carries no session identifier, so sessions are reconstructed
+heuristically: a session starts at a login and ends at a logout or after
+an idle gap. Interleaved traffic from concurrent users is attributed to
+whoever logged in most recently.
+"""
+
+import os
+import sys
+import mmap
+import json
+import heapq
+import argparse
+from collections import Counter, deque
+from datetime import datetime
+
+# Message logged at the start of every full script rerun
+RERUN_MESSAGE = b"Starting AI Assistant application"
+
+# Loggers of run_app.py, which logs RERUN_MESSAGE once per process start
+# rather than per rerun; its lines are identified by their logger name
+RUN_APP_LOGGERS = (b"__main__", b"run_app")
+
+# Message logged when the sidebar fragment renders
+SIDEBAR_MESSAGE = b"Rendering sidebar"
+
+# Messages identifying the view rendered by a rerun
+VIEW_MESSAGES = {
+    b"Rendering login page": "login",
+    b"Rendering chat interface": "chat",
+    b"Rendering metrics interface": "metrics",
+    b"Rendering history interface": "history",
+}
+
+# Messages that carry no information about reruns
+IGNORED_MESSAGES = [b"Rendering main application interface", b"Application initialized"]
+
+# Messages logged by widget handlers, matched exactly or by prefix
+EVENT_MESSAGES = {
+    b"User logged out": "Logout",
+    b"API key updated": "Update API Key",
+    b"Chat history cleared": "Clear Chat History",
+    b"Login attempt with missing credentials": "Login",
+}
+EVENT_PREFIXES = [
+    (b"User message: ", "Chat input"),
+    (b"New metric added: ", "Add Metric"),
+    (b"Chat history exported", "Prepare Export"),
+    (b"Imported ", "Import History"),
+]
+
+# Kinds of exactly matched messages, and the lookup table built from them
+RERUN, VIEW, SIDEBAR, EVENT, IGNORED = "rerun", "view", "sidebar", "event", "ignored"
+KNOWN_MESSAGES = {RERUN_MESSAGE: (RERUN, None), SIDEBAR_MESSAGE: (SIDEBAR, None)}
+KNOWN_MESSAGES.update({message: (IGNORED, None) for message in IGNORED_MESSAGES})
+KNOWN_MESSAGES.update({message: (VIEW, view) for message, view in VIEW_MESSAGES.items()})
+KNOWN_MESSAGES.update({message: (EVENT, label) for message, label in EVENT_MESSAGES.items()})
+
+# Logged in the run that authenticates a user: "User <name> logged in successfully"
+LOGIN_PREFIX = b"User "
+LOGIN_SUFFIX = b" logged in successfully"
+
+# Trigger label for reruns whose widget does not log anything
+UNLOGGED_TRIGGER = "Unlogged widget"
+
+# Bytes of the mapped log split into lines at a time
+BLOCK_SIZE = 64 * 1024 * 1024
+
+# Sessions shorter than this (seconds) report no rerun rate, as it would be noise
+MIN_RATE_DURATION = 10.0
+
+def parse_timestamp(line, day_cache):
+    """
+    Parse the leading "YYYY-MM-DD HH:MM:SS,mmm" timestamp into epoch seconds.
+
+    Only the date part goes through datetime, and it is cached per day,
+    since calling strptime on every line dominates the cost of a pass.
+    Returns None if the line has no timestamp.
+    """
+    day = line[:10]
+    base = day_cache.get(day)
+    if base is None:
+        try:
+            base = datetime.strptime(day.decode("ascii"), "%Y-%m-%d").timestamp()
+        except (UnicodeDecodeError, ValueError):
+            return None
+        day_cache[day] = base
+    try:
+        return base + int(line[11:13]) * 3600 + int(line[14:16]) * 60 + int(line[17:19]) + int(line[20:23]) / 1000
+    except ValueError:
+        return None
+
+def classify_event(message):
+    """
+    Return the widget label for a handler message that has a prefix, or None.
+    """
+    for prefix, label in EVENT_PREFIXES:
+        if message.startswith(prefix):
+            return label
+    return None
+
+class Session:
+    """
+    Aggregated statistics for one reconstructed user session.
+    """
+
+    def __init__(self, user, start):
+        self.user = user
+        self.start = start
+        self.end = start
+        self.reruns = 0
+        self.fragment_reruns = 0
+        self.redundant_reruns = 0
+        self.views = Counter()
+        self.storms = 0
+
+    def to_dict(self):
+        duration = self.end - self.start
+        return {
+            "user": self.user,
+            "start": datetime.fromtimestamp(self.start).isoformat(sep=" ", timespec="seconds"),
+            "duration_s": round(duration, 1),
+            "reruns": self.reruns,
+            "reruns_per_min": round(self.reruns / (duration / 60), 2) if duration >= MIN_RATE_DURATION else None,
+            "fragment_reruns": self.fragment_reruns,
+            "redundant_reruns": self.redundant_reruns,
+            "storms": self.storms,
+            "views": dict(self.views),
+        }
+
+class LogAnalyzer:
+    """
+    Single-pass analyzer that consumes log lines in order.
+
+    Only counters, the largest storms and a bounded window of recent rerun
+    times are kept, so memory use does not grow with the size of the log
+    unless per-session details are requested with keep_sessions.
+    """
+
+    def __init__(self, idle_timeout=1800.0, rerun_gap=0.5, storm_window=3.0, storm_count=5, top=10, keep_sessions=False):
+        self.idle_timeout = idle_timeout
+        self.rerun_gap = rerun_gap
+        self.storm_window = storm_window
+        self.storm_count = storm_count
+        self.top = top
+
+        self.day_cache = {}
+        self.lines = 0
+        self.session = None
+        self.session_count = 0
+        self.session_reruns = 0
+        self.session_time = 0.0
+        self.session_details = [] if keep_sessions else None
+        self.view_switches = Counter()
+        self.triggers = Counter()
+        self.redundant_by_trigger = Counter()
+        self.storm_total = 0
+        self.storms = []
+
+        # State of the rerun currently being read
+        self.run_start = None
+        self.run_view = None
+        self.run_events = []
+        self.run_sidebar = 0
+        self.run_fragment = False
+        self.logout_pending = False
+
+        # State carried between reruns; a session that logged out is kept
+        # open for the st.rerun() that follows the logout
+        self.last_run = None
+        self.last_view = None
+        self.last_trigger = None
+        self.last_had_event = False
+        self.session_ending = False
+        self.window = deque()
+        self.storm = None
+
+    def feed(self, line, message):
+        """
+        Process one log line given its already extracted message.
+        """
+
+        # Exact messages are resolved with a single dict lookup
+        kind, value = KNOWN_MESSAGES.get(message, (None, None))
+        if kind is RERUN:
+            timestamp = parse_timestamp(line, self.day_cache)
+            if timestamp is not None:
+                self._finish_run()
+                self.run_start = timestamp
+            return
+        if self.run_start is None or kind is IGNORED:
+            return
+        if kind is VIEW:
+            if self.run_view is None:
+                self.run_view = value
+            return
+        if kind is SIDEBAR:
+            self.run_sidebar += 1
+            if self.run_sidebar > 1:
+                timestamp = parse_timestamp(line, self.day_cache)
+                if timestamp is not None:
+                    self._finish_run()
+                    self.run_start = timestamp
+                    self.run_fragment = True
+                    self.run_sidebar = 1
+            return
+        if kind is EVENT:
+            self.run_events.append(value)
+            if value == "Logout":
+                self.logout_pending = True
+            return
+
+        if message.startswith(LOGIN_PREFIX) and message.endswith(LOGIN_SUFFIX):
+            user = message[len(LOGIN_PREFIX):-len(LOGIN_SUFFIX)].decode("utf-8", "replace")
+            self._start_session(user, self.run_start)
+            self.run_events.append("Login")
+            return
+        event = classify_event(message)
+        if event is not None:
+            self.run_events.append(event)
+
+    def _start_session(self, user, timestamp):
+        """
+        Close the current session and open a new one.
+        """
+        self._close_session()
+        self.session = Session(user, timestamp)
+        self.window.clear()
+
+    def _close_session(self):
+        """
+        Fold the current session, if any, into the overall totals.
+        """
+        self._close_storm()
+        session = self.session
+        if session is None:
+            return
+        self.session_count += 1
+        self.session_reruns += session.reruns
+        self.session_time += session.end - session.start
+        if self.session_details is not None:
+            self.session_details.append(session.to_dict())
+        self.session = None
+
+    def _session_at(self, timestamp, follow_up):
+        """
+        Return the session a run belongs to, starting a new one if needed.
+
+        A session that logged out is only continued by the follow-up rerun
+        of the logout, and any session is ended by an idle gap.
+        """
+        if self.session_ending and not follow_up:
+            self.session_ending = False
+            self._close_session()
+        if self.session is None or timestamp - self.session.end > self.idle_timeout:
+            user = self.session.user if self.session is not None else "anonymous"
+            self._start_session(user, timestamp)
+        return self.session
+
+    def _finish_run(self):
+        """
+        Classify the rerun that just ended and update all statistics.
+        """
+        if self.run_start is None:
+            return
+        if self.run_fragment:
+            self._finish_fragment()
+        else:
+            self._finish_full_run()
+
+        self.last_run = self.run_start
+        self.last_had_event = bool(self.run_events)
+        self.run_start = None
+        self.run_view = None
+        self.run_events = []
+        self.run_sidebar = 0
+        self.run_fragment = False
+
+        if self.logout_pending:
+            self.logout_pending = False
+            self.session_ending = True
+        elif self.session_ending:
+            # This was the rerun following the logout
+            self.session_ending = False
+            self._close_session()
+
+    def _finish_fragment(self):
+        """
+        Update the statistics for a sidebar fragment rerun.
+
+        Fragment reruns keep the current view and are not counted as full
+        reruns, but their handler becomes the trigger of a full rerun that
+        follows within rerun_gap, e.g. the st.rerun() issued by Logout.
+        """
+        timestamp = self.run_start
+        session = self._session_at(timestamp, False)
+        session.fragment_reruns += 1
+        session.end = timestamp
+        self.last_trigger = self.run_events[0] if self.run_events else UNLOGGED_TRIGGER
+
+    def _finish_full_run(self):
+        """
+        Attribute a full rerun to its trigger and update the statistics.
+        """
+        timestamp = self.run_start
+        # Runs that stop before rendering a view (e.g. logout) stay on the last one
+        view = self.run_view or self.last_view or "unknown"
+
+        # A rerun without events right after a handler run (or after a run
+        # of the same view) is the st.rerun() issued by that handler, even
+        # when it changes the view, e.g. from login to chat
+        gap = timestamp - self.last_run if self.last_run is not None else None
+        follows_handler = (
+            not self.run_events
+            and gap is not None and gap <= self.rerun_gap
+            and (self.last_had_event or view == self.last_view)
+        )
+
+        session = self._session_at(timestamp, follows_handler)
+
+        # Attribute the rerun to the widget that caused it
+        redundant = False
+        if self.run_events:
+            trigger = self.run_events[0]
+        elif follows_handler:
+            # The previous widget is to blame for this extra rerun
+            trigger = self.last_trigger or UNLOGGED_TRIGGER
+            redundant = True
+        elif self.last_view is not None and view != self.last_view:
+            trigger = "Navigation"
+        else:
+            trigger = UNLOGGED_TRIGGER
+
+        self.triggers[trigger] += 1
+        if redundant:
+            self.redundant_by_trigger[trigger] += 1
+            session.redundant_reruns += 1
+        if self.last_view is not None and view != self.last_view:
+            self.view_switches[(self.last_view, view)] += 1
+
+        session.reruns += 1
+        session.views[view] += 1
+        session.end = timestamp
+        self._track_storm(timestamp, trigger)
+
+        self.last_view = view
+        self.last_trigger = trigger
+
+    def _track_storm(self, timestamp, trigger):
+        """
+        Detect runs of at least storm_count reruns within storm_window seconds.
+        """
+        self.window.append(timestamp)
+        while timestamp - self.window[0] > self.storm_window:
+            self.window.popleft()
+
+        if len(self.window) >= self.storm_count:
+            if self.storm is None:
+                self.storm = {
+                    "user": self.session.user,
+                    "start": self.window[0],
+                    "end": timestamp,
+                    "reruns": len(self.window),
+                    "triggers": Counter([trigger]),
+                }
+                self.session.storms += 1
+            else:
+                self.storm["end"] = timestamp
+                self.storm["reruns"] += 1
+                self.storm["triggers"][trigger] += 1
+        elif self.storm is not None and timestamp - self.storm["end"] > self.storm_window:
+            self._close_storm()
+
+    def _close_storm(self):
+        """
+        Record the storm in progress, if any, keeping only the largest ones.
+        """
+        if self.storm is not None:
+            self.storm_total += 1
+            entry = (self.storm["reruns"], self.storm_total, self.storm)
+            if len(self.storms) < self.top:
+                heapq.heappush(self.storms, entry)
+            else:
+                heapq.heappushpop(self.storms, entry)
+            self.storm = None
+
+    def finish(self):
+        """
+        Flush the last rerun and storm after the final line.
+        """
+        self._finish_run()
+        self._close_session()
+
+    def report(self):
+        """
+        Return the analysis results as a JSON-serializable dictionary.
+        """
+        storms = [storm for _, _, storm in sorted(self.storms, reverse=True)]
+        return {
+            "lines": self.lines,
+            "sessions": self.session_count,
+            "reruns": self.session_reruns,
+            "reruns_per_min": round(self.session_reruns / (self.session_time / 60), 2) if self.session_time >= MIN_RATE_DURATION else None,
+            "storms_detected": self.storm_total,
+            "redundant_reruns": sum(self.redundant_by_trigger.values()),
+            "triggers": [
+                {"widget": widget, "reruns": count, "redundant": self.redundant_by_trigger[widget]}
+                for widget, count in self.triggers.most_common()
+            ],
+            "view_switches": [
+                {"from": source, "to": target, "count": count}
+                for (source, target), count in self.view_switches.most_common(self.top)
+            ],
+            "storms": [
+                {
+                    "user": storm["user"],
+                    "start": datetime.fromtimestamp(storm["start"]).isoformat(sep=" ", timespec="milliseconds"),
+                    "duration_s": round(storm["end"] - storm["start"], 3),
+                    "reruns": storm["reruns"],
+                    "top_widget": storm["triggers"].most_common(1)[0][0],
+                }
+                for storm in storms
+            ],
+            "session_details": self.session_details,
+        }
+
+def analyze_file(path, block_size=BLOCK_SIZE, **options):
+    """
+    Analyze a log file in one streaming pass over a memory-mapped view.
+
+    The file is mapped read-only and consumed in blocks that end on a line
+    boundary, so the operating system pages it in as the pass advances and
+    multi-GB logs are never loaded into memory. Splitting a whole block at
+    once is much faster than reading it line by line.
+    """
+    analyzer = LogAnalyzer(**options)
+    with open(path, "rb") as log_file:
+        size = os.fstat(log_file.fileno()).st_size
+        if size > 0:
+            with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                start = 0
+                while start < size:
+                    end = mapped.find(b"\n", min(start + block_size, size) - 1)
+                    end = size if end == -1 else end + 1
+                    for line in mapped[start:end].splitlines():
+                        analyzer.lines += 1
+                        # Skip lines without a timestamp, e.g. tracebacks
+                        if line[4:5] != b"-" or line[23:24] != b" ":
+                            continue
+                        # main.py logs "%(asctime)s %(levelname)s %(message)s" and run_app.py
+                        # "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+                        if line[24:26] == b"- ":
+                            fields = line[26:].split(b" - ", 2)
+                            # Skip truncated lines, e.g. the last line of a log being written
+                            if len(fields) < 3:
+                                continue
+                            # run_app.py logs the same start message once per process
+                            if fields[0] in RUN_APP_LOGGERS:
+                                continue
+                            message = fields[2]
+                        else:
+                            message = line[line.find(b" ", 24) + 1:]
+                        analyzer.feed(line, message)
+                    start = end
+    analyzer.finish()
+    return analyzer
+
+def print_report(report):
+    """
+    Print the analysis results as plain-text tables.
+    """
+    print(f"Lines read:        {report['lines']}")
+    print(f"Sessions:          {report['sessions']}")
+    print(f"Full reruns:       {report['reruns']}")
+    print(f"Reruns per minute: {report['reruns_per_min']}")
+    print(f"Redundant reruns:  {report['redundant_reruns']}")
+
+    print("\nReruns by triggering widget")
+    print(f"  {'Widget':<25} {'Reruns':>8} {'Redundant':>10}")
+    for row in report["triggers"]:
+        print(f"  {row['widget']:<25} {row['reruns']:>8} {row['redundant']:>10}")
+
+    print("\nView switches")
+    for row in report["view_switches"]:
+        print(f"  {row['from']:>8} -> {row['to']:<8} {row['count']:>8}")
+
+    print(f"\nRerun storms ({report['storms_detected']} detected)")
+    if not report["storms"]:
+        print("  none")
+    for storm in report["storms"]:
+        print(f"  {storm['start']}  {storm['user']:<15} {storm['reruns']:>4} reruns in {storm['duration_s']:>6.2f}s  (mostly: {storm['top_widget']})")
+
+    if report["session_details"] is not None:
+        print("\nSessions")
+        for session in report["session_details"]:
+            print(f"  {session['start']}  {session['user']:<15} {session['reruns']:>5} reruns  {session['duration_s']:>8.1f}s  {session['reruns_per_min']} /min  storms: {session['storms']}")
+
+def main():
+    """
+    Parse command-line arguments, analyze the log and print the report.
+    """
+    parser = argparse.ArgumentParser(description="Analyze rerun patterns in the AI Assistant app log")
+    parser.add_argument("log_file", nargs="?", default="app.log", help="log file to analyze (default: app.log)")
+    parser.add_argument("--idle-timeout", type=float, default=1800.0, help="seconds of inactivity that end a session (default: 1800)")
+    parser.add_argument("--rerun-gap", type=float, default=0.5, help="max seconds between a rerun and the st.rerun() it triggers (default: 0.5)")
+    parser.add_argument("--storm-window", type=float, default=3.0, help="sliding window for storm detection in seconds (default: 3)")
+    parser.add_argument("--storm-count", type=int, default=5, help="reruns within the window that make a storm (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="number of storms and view switches to list (default: 10)")
+    parser.add_argument("--sessions", action="store_true", help="also list every reconstructed session")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log_file):
+        print(f"Log file not found: {args.log_file}", file=sys.stderr)
+        sys.exit(1)
+
+    analyzer = analyze_file(
+        args.log_file,
+        idle_timeout=args.idle_timeout,
+        rerun_gap=args.rerun_gap,
+        storm_window=args.storm_window,
+        storm_count=args.storm_count,
+        top=args.top,
+        keep_sessions=args.sessions,
+    )
+    report = analyzer.report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
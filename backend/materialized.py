@@ -0,0 +1,346 @@
+"""
+Materialization module for the AI Assistant application.
+Keeps precomputed metric aggregates that are refreshed incrementally.
+
+Metrics are computed from a mock `events` fact table in SQLite. A metric
+marked as materialized has its numerator and denominator aggregates stored
+per (event_date, region) bucket in `metric_aggregates`. A background
+scheduler refreshes them incrementally: every metric has a watermark (the
+highest event ID already aggregated), and only the buckets touched by newer
+events are recomputed. Queries are served from the aggregates while they
+are fresh and fall back to a live query over `events` otherwise.
+"""
+
+import os
+import re
+import time
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import date, timedelta
+
+import streamlit as st
+
+# Dimensions aggregates are stored and queried by, mapped to their column
+DIMENSIONS = {"date": "event_date", "region": "region"}
+
+# Aggregate expressions that can be rolled up by summing per-bucket values:
+# a single SUM or COUNT call, without DISTINCT, over non-aggregate terms
+ADDITIVE_AGGREGATE = re.compile(
+    r"\s*(SUM|COUNT)\s*\((?!\s*DISTINCT\b)([^()]|\([^()]*\))*\)\s*", re.IGNORECASE
+)
+AGGREGATE_FUNCTION = re.compile(r"\b(SUM|TOTAL|COUNT|AVG|MIN|MAX|GROUP_CONCAT)\s*\(", re.IGNORECASE)
+
+# Regions and history length of the mock events table
+MOCK_REGIONS = ["North America", "Europe", "Asia"]
+MOCK_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_date TEXT NOT NULL,
+    region TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    revenue REAL NOT NULL,
+    converted INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_bucket ON events (event_date, region);
+CREATE TABLE IF NOT EXISTS metric_aggregates (
+    metric TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    region TEXT NOT NULL,
+    numerator REAL,
+    denominator REAL,
+    PRIMARY KEY (metric, event_date, region)
+);
+CREATE TABLE IF NOT EXISTS metric_watermarks (
+    metric TEXT PRIMARY KEY,
+    definition TEXT NOT NULL,
+    last_event_id INTEGER NOT NULL,
+    refreshed_at REAL
+);
+"""
+
+# Get the logger from the main app
+logger = logging.getLogger(__name__)
+
+def _definition_key(aggregate):
+    """
+    Return a string identifying an aggregate definition.
+
+    A stored watermark is only valid for the definition it was built with.
+    """
+    return f"{aggregate['numerator']}|{aggregate.get('denominator') or ''}"
+
+def is_additive(aggregate):
+    """
+    Return whether an aggregate can be served from materialized buckets.
+
+    Queries roll buckets up with SUM, which is only exact for SUM and COUNT
+    aggregates. Distinct counts, averages and extrema are not additive, nor
+    is any aggregate explicitly marked with "additive": False.
+    """
+    if not aggregate.get("additive", True):
+        return False
+    for expression in (aggregate["numerator"], aggregate.get("denominator")):
+        if expression is None:
+            continue
+        match = ADDITIVE_AGGREGATE.fullmatch(expression)
+        if match is None or AGGREGATE_FUNCTION.search(expression, match.end(1)):
+            return False
+    return True
+
+class MetricStore:
+    """
+    SQLite-backed store of events and materialized metric aggregates.
+
+    Each operation opens its own connection, so the store can be shared by
+    Streamlit sessions and the refresh scheduler thread.
+    """
+
+    def __init__(self, path, max_staleness):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.definitions = {}
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def seed_mock_events(self):
+        """
+        Fill the events table with deterministic mock data if it is empty.
+        """
+        with closing(self._connect()) as conn, conn:
+            if conn.execute("SELECT 1 FROM events LIMIT 1").fetchone():
+                return
+            rng = random.Random(42)
+            today = date.today()
+            rows = []
+            for offset in range(MOCK_DAYS, 0, -1):
+                event_date = (today - timedelta(days=offset)).isoformat()
+                for region_index, region in enumerate(MOCK_REGIONS):
+                    for _ in range(rng.randint(30, 60)):
+                        converted = rng.random() < 0.12
+                        rows.append((
+                            event_date,
+                            region,
+                            region_index * 1000 + rng.randint(1, 400),
+                            round(rng.uniform(20, 400), 2) if converted else 0.0,
+                            int(converted),
+                        ))
+            conn.executemany(
+                "INSERT INTO events (event_date, region, user_id, revenue, converted) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        logger.info(f"Seeded {len(rows)} mock events")
+
+    def append_events(self, rows):
+        """
+        Insert new (event_date, region, user_id, revenue, converted) rows.
+
+        New events get IDs above every watermark, so the next refresh picks
+        up exactly the buckets they touch.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO events (event_date, region, user_id, revenue, converted) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def validate(self, aggregate):
+        """
+        Raise sqlite3.Error if an aggregate is not valid over the events table.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(f"SELECT {aggregate['numerator']}, {aggregate.get('denominator') or 'NULL'} FROM events LIMIT 0")
+
+    def register(self, name, aggregate):
+        """
+        Mark a metric as materialized and build its aggregates.
+
+        Raises ValueError if the aggregate is not additive (see is_additive)
+        and sqlite3.Error if its expressions are not valid over the events
+        table. Aggregates built with a different definition are discarded
+        and rebuilt.
+        """
+        if not is_additive(aggregate):
+            raise ValueError("only SUM and COUNT aggregates can be precomputed")
+        self.validate(aggregate)
+        definition = _definition_key(aggregate)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT definition FROM metric_watermarks WHERE metric = ?", (name,)).fetchone()
+            if row is None or row[0] != definition:
+                conn.execute("DELETE FROM metric_aggregates WHERE metric = ?", (name,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO metric_watermarks (metric, definition, last_event_id, refreshed_at) VALUES (?, ?, 0, NULL)",
+                    (name, definition)
+                )
+        with self._lock:
+            self.definitions[name] = aggregate
+        logger.info(f"Metric {name} materialized")
+        self.refresh(name)
+
+    def unregister(self, name):
+        """
+        Stop materializing a metric and drop its aggregates.
+        """
+        with self._lock:
+            self.definitions.pop(name, None)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM metric_aggregates WHERE metric = ?", (name,))
+            conn.execute("DELETE FROM metric_watermarks WHERE metric = ?", (name,))
+        logger.info(f"Metric {name} no longer materialized")
+
+    def refresh(self, name):
+        """
+        Incrementally refresh one metric's aggregates.
+
+        Buckets touched by events above the watermark are recomputed in full
+        from the events table, which keeps the result exact for any
+        aggregate, and the watermark is advanced in the same transaction.
+        Returns the number of buckets recomputed.
+        """
+        aggregate = self.definitions.get(name)
+        if aggregate is None:
+            return 0
+        numerator = aggregate["numerator"]
+        denominator = aggregate.get("denominator") or "NULL"
+        with closing(self._connect()) as conn, conn:
+            # Take the write lock up front so concurrent refreshes of the
+            # same metric cannot both read the old watermark
+            conn.execute("BEGIN IMMEDIATE")
+            watermark = conn.execute("SELECT last_event_id FROM metric_watermarks WHERE metric = ?", (name,)).fetchone()
+            if watermark is None:
+                return 0
+            last_event_id = watermark[0]
+            high_water = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+            buckets = 0
+            if high_water > last_event_id:
+                touched = "SELECT DISTINCT event_date, region FROM events WHERE id > ? AND id <= ?"
+                conn.execute(
+                    f"DELETE FROM metric_aggregates WHERE metric = ? AND (event_date, region) IN ({touched})",
+                    (name, last_event_id, high_water)
+                )
+                buckets = conn.execute(
+                    f"INSERT INTO metric_aggregates (metric, event_date, region, numerator, denominator) "
+                    f"SELECT ?, event_date, region, {numerator}, {denominator} FROM events "
+                    f"WHERE id <= ? AND (event_date, region) IN ({touched}) "
+                    f"GROUP BY event_date, region",
+                    (name, high_water, last_event_id, high_water)
+                ).rowcount
+            conn.execute(
+                "UPDATE metric_watermarks SET last_event_id = ?, refreshed_at = ? WHERE metric = ?",
+                (high_water, time.time(), name)
+            )
+        if buckets:
+            logger.info(f"Refreshed {buckets} buckets of metric {name}")
+        return buckets
+
+    def refresh_all(self):
+        """
+        Incrementally refresh every materialized metric.
+        """
+        with self._lock:
+            names = list(self.definitions)
+        for name in names:
+            self.refresh(name)
+
+    def status(self, name):
+        """
+        Return the watermark, refresh time and freshness of a metric, or None.
+        """
+        with closing(self._connect()) as conn:
+            return self._status(conn, name)
+
+    def _status(self, conn, name):
+        row = conn.execute("SELECT last_event_id, refreshed_at FROM metric_watermarks WHERE metric = ?", (name,)).fetchone()
+        if row is None or name not in self.definitions:
+            return None
+        last_event_id, refreshed_at = row
+        high_water = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        fresh = refreshed_at is not None and (
+            last_event_id >= high_water or time.time() - refreshed_at <= self.max_staleness
+        )
+        return {"last_event_id": last_event_id, "refreshed_at": refreshed_at, "fresh": fresh}
+
+    def query(self, name, aggregate, by=None, start_date=None, end_date=None):
+        """
+        Return a metric's values and where they were served from.
+
+        by is None for a single total or one of DIMENSIONS. Dates are
+        inclusive. Fresh materialized aggregates are rolled up when
+        available; otherwise the metric is computed live from events.
+        Returns a tuple of ([(dimension value, metric value), ...], status)
+        where status is the materialization status, or None for live results.
+        """
+        dimension = DIMENSIONS[by] if by else "'total'"
+        start = (start_date or date.min).isoformat()
+        end = (end_date or date.max).isoformat()
+        with closing(self._connect()) as conn:
+            status = self._status(conn, name)
+            if status is not None and status["fresh"]:
+                rows = conn.execute(
+                    f"SELECT {dimension}, SUM(numerator), SUM(denominator) FROM metric_aggregates "
+                    f"WHERE metric = ? AND event_date BETWEEN ? AND ? GROUP BY 1 ORDER BY 1",
+                    (name, start, end)
+                ).fetchall()
+            else:
+                status = None
+                rows = conn.execute(
+                    f"SELECT {dimension}, {aggregate['numerator']}, {aggregate.get('denominator') or 'NULL'} FROM events "
+                    f"WHERE event_date BETWEEN ? AND ? GROUP BY 1 ORDER BY 1",
+                    (start, end)
+                ).fetchall()
+        values = []
+        for key, numerator, denominator in rows:
+            if aggregate.get("denominator"):
+                values.append((key, numerator / denominator if denominator else None))
+            else:
+                values.append((key, numerator))
+        return values, status
+
+class RefreshScheduler(threading.Thread):
+    """
+    Daemon thread that refreshes all materialized metrics periodically.
+    """
+
+    def __init__(self, store, interval):
+        super().__init__(name="metric-refresh", daemon=True)
+        self.store = store
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.store.refresh_all()
+            except sqlite3.Error as e:
+                logger.error(f"Metric refresh failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+@st.cache_resource(show_spinner=False)
+def get_metric_store():
+    """
+    Return the process-wide metric store, starting its refresh scheduler.
+
+    Created on first use, so neither the database nor the scheduler thread
+    are set up until a view needs metric data. Configured through the
+    METRICS_DB_PATH, METRICS_REFRESH_INTERVAL and METRICS_MAX_STALENESS
+    environment variables.
+    """
+    store = MetricStore(
+        os.getenv("METRICS_DB_PATH", "metrics.db"),
+        float(os.getenv("METRICS_MAX_STALENESS", "300"))
+    )
+    store.seed_mock_events()
+    RefreshScheduler(store, float(os.getenv("METRICS_REFRESH_INTERVAL", "60"))).start()
+    logger.info("Metric store initialized")
+    return store
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the AI Assistant application.
+This script compares the original startup path against the current one.
+
+The "baseline" snippets reproduce the code as it was before startup work
+was deferred: run_app.check_dependencies imported every dependency, and
+main.py called load_dotenv() and logging.basicConfig() at module level, so
+both ran again on every Streamlit rerun.
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+import statistics
+import argparse
+
+# Project root, put on the path of every benchmark interpreter
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Original body of run_app.check_dependencies
+BASELINE_CHECK_DEPENDENCIES = "import streamlit, openai, pandas, dotenv"
+
+# Original module-level initialization of main.py
+BASELINE_INIT = """
+from dotenv import load_dotenv
+load_dotenv()
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s %(levelname)s %(message)s',
+    handlers=[logging.FileHandler("app.log"), logging.StreamHandler()]
+)
+"""
+
+# Each scenario is (name, untimed setup, timed snippet, iterations) and runs
+# in a fresh interpreter, so module caches never leak between measurements.
+# The reported time is per iteration.
+SCENARIOS = [
+    (
+        "check_dependencies (baseline)",
+        "",
+        BASELINE_CHECK_DEPENDENCIES,
+        1,
+    ),
+    (
+        "check_dependencies (current)",
+        "import logging, run_app; run_app.logger = logging.getLogger()",
+        "run_app.check_dependencies()",
+        1,
+    ),
+    (
+        "import main (baseline)",
+        "",
+        "import logging, streamlit, frontend.login, frontend.interface\n" + BASELINE_INIT,
+        1,
+    ),
+    (
+        "import main (current)",
+        "",
+        "import main",
+        1,
+    ),
+    (
+        "per-rerun initialization (baseline)",
+        "import logging, dotenv, streamlit",
+        BASELINE_INIT,
+        100,
+    ),
+    (
+        "per-rerun initialization (current)",
+        "import main",
+        "main.initialize_app()",
+        100,
+    ),
+]
+
+def time_snippet(setup, snippet, iterations, repeats, workdir):
+    """
+    Measure how long a fresh interpreter takes to run a snippet.
+
+    The setup is excluded from the measurement, and the snippet is run
+    iterations times in a row. The median over several interpreters is
+    returned in milliseconds per iteration, or None if the snippet fails.
+    """
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {PROJECT_DIR!r})\n"
+        f"{setup}\n"
+        "_t = time.perf_counter()\n"
+        f"for _ in range({iterations}):\n"
+        + "".join(f"    {line}\n" for line in snippet.strip().splitlines())
+        + f"print((time.perf_counter() - _t) * 1000 / {iterations})"
+    )
+    samples = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=workdir)
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main():
+    """
+    Run all benchmark scenarios and print a summary table.
+
+    Scenarios run in a temporary directory so the log files they write do
+    not touch the project. Scenarios that fail, e.g. because a dependency
+    is not installed, are reported as skipped.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark application startup")
+    parser.add_argument("--repeats", type=int, default=5, help="interpreters per scenario (default: 5)")
+    args = parser.parse_args()
+
+    print(f"{'Scenario':<40} {'Median (ms)':>12}")
+    print("-" * 53)
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, setup, snippet, iterations in SCENARIOS:
+            elapsed = time_snippet(setup, snippet, iterations, args.repeats, workdir)
+            if elapsed is None:
+                print(f"{name:<40} {'skipped':>12}")
+            else:
+                print(f"{name:<40} {elapsed:>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+History import/export module for the AI Assistant application.
+Streams chat history to and from JSONL and Parquet files in fixed-size batches.
+"""
+
+import io
+import json
+import uuid
+import logging
+from datetime import datetime
+
+# Supported export formats: display name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Fields written for every exported message, in column order
+MESSAGE_FIELDS = ["id", "session_id", "created_at", "role", "content", "related_questions", "attribution", "drill_down_data"]
+
+# Roles accepted when importing messages
+VALID_ROLES = ("user", "assistant")
+
+# Number of messages serialized or inserted at a time
+BATCH_SIZE = 5000
+
+# Get the logger from the main app
+logger = logging.getLogger(__name__)
+
+def new_message(role, content, session_id=None, **extra):
+    """
+    Create a chat message stamped with an ID, session ID and creation time.
+
+    The ID lets a message be referenced independently of its position in
+    the history, and the timestamp allows exporting a date range.
+    """
+    message = {
+        "id": uuid.uuid4().hex,
+        "session_id": session_id,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "role": role,
+        "content": content,
+    }
+    message.update(extra)
+    return message
+
+def iter_messages(history, session_id=None, start_date=None, end_date=None):
+    """
+    Yield the messages of a history matching a session and/or date range.
+
+    Dates are inclusive. Messages without a valid creation time are only
+    yielded when no date range is given.
+    """
+    for message in history:
+        if session_id is not None and message.get("session_id") != session_id:
+            continue
+        if start_date is not None or end_date is not None:
+            try:
+                created = datetime.fromisoformat(message["created_at"]).date()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if start_date is not None and created < start_date:
+                continue
+            if end_date is not None and created > end_date:
+                continue
+        yield message
+
+def iter_batches(messages, batch_size=BATCH_SIZE):
+    """
+    Group an iterable of messages into lists of at most batch_size items.
+    """
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _export_row(message):
+    """
+    Project a message onto the exported fields, filling gaps with None.
+    """
+    return {field: message.get(field) for field in MESSAGE_FIELDS}
+
+def iter_jsonl_chunks(messages, batch_size=BATCH_SIZE):
+    """
+    Yield a JSONL export as encoded chunks of batch_size messages each.
+    """
+    for batch in iter_batches(messages, batch_size):
+        yield "".join(json.dumps(_export_row(message), ensure_ascii=False) + "\n" for message in batch).encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that buffers bytes until they are drained.
+
+    pyarrow records file offsets in the Parquet footer using tell(), so the
+    position keeps counting across drains even though the data is released.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _parquet_schema():
+    """
+    Return the Arrow schema of exported messages.
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        (field, pa.list_(pa.string()) if field == "related_questions" else pa.string())
+        for field in MESSAGE_FIELDS
+    ])
+
+def iter_parquet_chunks(messages, batch_size=BATCH_SIZE):
+    """
+    Yield a Parquet export as encoded chunks, one row group per batch.
+
+    pyarrow is imported on first use to keep it off the startup path.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in iter_batches(messages, batch_size):
+            writer.write_table(pa.Table.from_pylist([_export_row(message) for message in batch], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+def write_export(messages, export_format):
+    """
+    Serialize messages into the bytes of an export file.
+
+    st.download_button keeps the whole file in memory either way, so the
+    export is returned as bytes; the chunked writers only keep a single
+    batch of serialized rows in flight while it is assembled.
+    """
+    chunks = iter_parquet_chunks(messages) if export_format == "Parquet" else iter_jsonl_chunks(messages)
+    return b"".join(chunks)
+
+def validate_message(record):
+    """
+    Validate an imported record and normalize it into a chat message.
+
+    Returns None when the record is not a usable message, including when
+    session_id, attribution or drill_down_data is present but not a string.
+    Unknown fields are dropped and a missing ID is generated.
+    """
+    if not isinstance(record, dict):
+        return None
+    if record.get("role") not in VALID_ROLES or not isinstance(record.get("content"), str):
+        return None
+    for field in ("session_id", "attribution", "drill_down_data"):
+        if record.get(field) is not None and not isinstance(record[field], str):
+            return None
+    related_questions = record.get("related_questions")
+    if related_questions is not None and (not isinstance(related_questions, list) or not all(isinstance(q, str) for q in related_questions)):
+        return None
+    created_at = record.get("created_at")
+    if created_at is not None:
+        try:
+            datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            return None
+
+    message = {field: record[field] for field in MESSAGE_FIELDS if record.get(field) is not None}
+    if not isinstance(message.get("id"), str):
+        message["id"] = uuid.uuid4().hex
+    return message
+
+def _iter_jsonl_records(uploaded_file):
+    """
+    Yield decoded JSONL records, with None for lines that are not JSON.
+    """
+    for line in uploaded_file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def _iter_parquet_records(uploaded_file, batch_size):
+    """
+    Yield Parquet records, reading one batch of rows at a time.
+    """
+    import pyarrow.parquet as pq
+
+    for record_batch in pq.ParquetFile(uploaded_file).iter_batches(batch_size=batch_size):
+        yield from record_batch.to_pylist()
+
+def import_history(uploaded_file, import_format, history, batch_size=BATCH_SIZE):
+    """
+    Validate records from an uploaded file and append them to a history.
+
+    Records are inserted in batches as they are read. Invalid records and
+    messages whose ID is already in the history are skipped. Returns a
+    tuple of (imported, skipped) counts.
+    """
+    if import_format == "Parquet":
+        records = _iter_parquet_records(uploaded_file, batch_size)
+    else:
+        records = _iter_jsonl_records(uploaded_file)
+
+    known_ids = {message.get("id") for message in history}
+    imported = skipped = 0
+    for batch in iter_batches(records, batch_size):
+        valid = []
+        for record in batch:
+            message = validate_message(record)
+            if message is None or message["id"] in known_ids:
+                skipped += 1
+                continue
+            known_ids.add(message["id"])
+            valid.append(message)
+        history.extend(valid)
+        imported += len(valid)
+
+    logger.info(f"Imported {imported} messages, skipped {skipped}")
+    return imported, skipped
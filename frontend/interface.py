@@ -5,13 +5,22 @@ Handles the sidebar, chat interface, and other UI components.
 
 import streamlit as st
 import logging
+import sqlite3
+from datetime import date, timedelta
+
+from backend.materialized import get_metric_store, is_additive
+from frontend.history_io import EXPORT_FORMATS, new_message, iter_messages, write_export, import_history
+from frontend.render_cache import CHUNK_SIZE, escape_dollars, sanitize_markdown, render_key, prerender_message, prerender_chunk, chunk_starts, chunk_key
 
 # Mock data for demonstration
 MOCK_DATA = {
     "metrics": [
-        {"id": 1, "name": "Revenue", "description": "Total revenue generated"},
-        {"id": 2, "name": "User Count", "description": "Number of active users"},
-        {"id": 3, "name": "Conversion Rate", "description": "Percentage of visitors who convert"}
+        {"id": 1, "name": "Revenue", "description": "Total revenue generated",
+         "aggregate": {"numerator": "SUM(revenue)", "format": "${:,.0f}"}, "materialized": False},
+        {"id": 2, "name": "User Count", "description": "Number of active users",
+         "aggregate": {"numerator": "COUNT(DISTINCT user_id)", "format": "{:,.0f}", "additive": False}, "materialized": False},
+        {"id": 3, "name": "Conversion Rate", "description": "Percentage of visitors who convert",
+         "aggregate": {"numerator": "SUM(converted)", "denominator": "COUNT(*)", "format": "{:.1%}"}, "materialized": False}
     ],
     "models": ["GPT-4", "GPT-3.5", "Claude-2"],
     "languages": ["English", "Chinese"],
@@ -25,69 +34,119 @@ MOCK_DATA = {
     ]
 }
 
+# Number of most recent messages rendered individually with their buttons;
+# older messages are coalesced into pre-rendered chunks of CHUNK_SIZE
+RECENT_MESSAGES = 4
+
+# Number of older chunks rendered initially and added per "Show earlier messages"
+OLDER_CHUNKS_SHOWN = 4
+
+# Number of days covered by metric answers in the chat
+METRIC_LOOKBACK_DAYS = 30
+
 # Get the logger from the main app
 logger = logging.getLogger(__name__)
 
+def _answer_metric_question(prompt):
+    """
+    Answer a chat prompt that mentions a known metric.
+
+    The metric total and its breakdown by region over the last
+    METRIC_LOOKBACK_DAYS days are served from materialized aggregates when
+    they are fresh, or computed live otherwise. Returns a tuple of
+    (response, attribution, drill-down data), or None if no metric matches.
+    """
+    for metric in MOCK_DATA["metrics"]:
+        aggregate = metric.get("aggregate")
+        if not aggregate or metric["name"].lower() not in prompt.lower():
+            continue
+        
+        store = get_metric_store()
+        start_date = date.today() - timedelta(days=METRIC_LOOKBACK_DAYS)
+        total, status = store.query(metric["name"], aggregate, start_date=start_date)
+        by_region, _ = store.query(metric["name"], aggregate, by="region", start_date=start_date)
+        
+        value_format = aggregate.get("format", "{:,.2f}")
+        def format_value(value):
+            if value is None:
+                return "n/a"
+            # Expressions such as MAX(region) return text, which numeric formats reject
+            if not isinstance(value, (int, float)):
+                return str(value)
+            return value_format.format(value)
+        
+        response = f"{metric['name']} over the last {METRIC_LOOKBACK_DAYS} days: {format_value(total[0][1] if total else None)}"
+        drill_down = f"{metric['name']} by region: " + ", ".join(f"{region}: {format_value(value)}" for region, value in by_region)
+        if status is not None:
+            attribution = f"Served from materialized aggregates (events up to #{status['last_event_id']})"
+        else:
+            attribution = "Computed live from the events table"
+        return response, attribution, drill_down
+    return None
+
+@st.fragment
 def render_sidebar():
     """
-    Render the sidebar with settings and navigation options.
+    Render the sidebar with settings options.
     
     This function displays the sidebar containing:
     - User information and logout button
     - Model selection dropdown
     - Language selection radio buttons
-    - Navigation buttons for different views
     - API key configuration
+    
+    It is a fragment, so interacting with these widgets reruns only the
+    sidebar instead of the whole app. Page navigation is handled by
+    st.navigation in main.py. The caller is responsible for placing the
+    fragment inside st.sidebar, as fragments cannot open it themselves.
     """
     logger.info("Rendering sidebar")
     
-    # Sidebar for settings and navigation
-    with st.sidebar:
-        st.title("Settings")
-        
-        # User info and logout
-        st.write(f"Welcome, {st.session_state.current_user}")
-        if st.button("Logout"):
-            st.session_state.logged_in = False
-            st.session_state.current_user = None
-            st.session_state.chat_history = []
-            logger.info("User logged out")
-            st.rerun()
-            
-        # Model selection
-        st.subheader("Model Selection")
-        selected_model = st.selectbox(
-            "Choose Model:",
-            MOCK_DATA["models"],
-            index=MOCK_DATA["models"].index(st.session_state.selected_model) if st.session_state.selected_model in MOCK_DATA["models"] else 0
-        )
-        st.session_state.selected_model = selected_model
+    st.title("Settings")
+    
+    # User info and logout
+    st.write(f"Welcome, {st.session_state.current_user}")
+    if st.button("Logout"):
+        st.session_state.logged_in = False
+        st.session_state.current_user = None
+        st.session_state.chat_history = []
+        logger.info("User logged out")
+        # Full app rerun so the login page replaces the main app
+        st.rerun(scope="app")
         
-        # Language selection
-        st.subheader("Language")
-        selected_language = st.radio(
-            "Choose Language:",
-            MOCK_DATA["languages"],
-            index=MOCK_DATA["languages"].index(st.session_state.selected_language) if st.session_state.selected_language in MOCK_DATA["languages"] else 0
-        )
-        st.session_state.selected_language = selected_language
+    # Model selection
+    st.subheader("Model Selection")
+    selected_model = st.selectbox(
+        "Choose Model:",
+        MOCK_DATA["models"],
+        index=MOCK_DATA["models"].index(st.session_state.selected_model) if st.session_state.selected_model in MOCK_DATA["models"] else 0
+    )
+    st.session_state.selected_model = selected_model
+    
+    # Language selection
+    st.subheader("Language")
+    selected_language = st.radio(
+        "Choose Language:",
+        MOCK_DATA["languages"],
+        index=MOCK_DATA["languages"].index(st.session_state.selected_language) if st.session_state.selected_language in MOCK_DATA["languages"] else 0
+    )
+    st.session_state.selected_language = selected_language
         
-        # Navigation buttons
-        st.subheader("Navigation")
-        if st.button("Chat Interface"):
-            st.session_state.current_view = "chat"
-        if st.button("Metrics Definition"):
-            st.session_state.current_view = "metrics"
-        if st.button("History"):
-            st.session_state.current_view = "history"
-            
-        # API Key input
-        st.subheader("API Configuration")
-        api_key = st.text_input("API Key:", value=st.session_state.api_key, type="password")
-        if st.button("Update API Key"):
-            st.session_state.api_key = api_key
-            st.success("API Key updated!")
-            logger.info("API key updated")
+    # API Key input
+    st.subheader("API Configuration")
+    api_key = st.text_input("API Key:", value=st.session_state.api_key, type="password")
+    if st.button("Update API Key"):
+        st.session_state.api_key = api_key
+        st.success("API Key updated!")
+        logger.info("API key updated")
+
+def _show_earlier_messages():
+    """
+    Render OLDER_CHUNKS_SHOWN more chunks of older messages.
+    
+    Used as an on_click callback so the click costs a single rerun.
+    """
+    st.session_state.older_chunks_shown = st.session_state.get("older_chunks_shown", OLDER_CHUNKS_SHOWN) + OLDER_CHUNKS_SHOWN
 
 def render_chat_interface():
     """
@@ -95,37 +154,56 @@ def render_chat_interface():
     
     This function displays:
     - Welcome message for new sessions
-    - Chat history with user and assistant messages
+    - Older messages coalesced into pre-rendered chunks, newest first loaded
+    - Recent messages with user and assistant messages
     - Related questions as buttons
     - Attribution and drill-down data buttons
     - Chat input for new messages
+    
+    Message markdown is sanitized once and cached (see
+    frontend/render_cache.py). Older chunks are aligned to fixed history
+    positions, so only the newest chunk is rebuilt as the chat grows, and
+    only the latest OLDER_CHUNKS_SHOWN chunks are rendered by default.
     """
     logger.info("Rendering chat interface")
     st.title("AI Assistant Chat")
     
-    # Display welcome message if chat history is empty
+    # Add welcome message to chat history if it is empty; it is displayed
+    # together with the rest of the history below
     if not st.session_state.chat_history:
-        with st.chat_message("assistant"):
-            welcome_message = "Hello! I'm your AI assistant. How can I help you today?"
-            st.markdown(welcome_message)
-            
-            # Add welcome message to chat history
-            st.session_state.chat_history.append({
-                "role": "assistant", 
-                "content": welcome_message,
-                "related_questions": [
-                    "What can you help me with?",
-                    "How do I use this application?",
-                    "What metrics can I analyze?"
-                ],
-                "attribution": "Default welcome message",
-                "drill_down_data": "Welcome to the AI Assistant application"
-            })
+        welcome_message = "Hello! I'm your AI assistant. How can I help you today?"
+        st.session_state.chat_history.append(new_message(
+            "assistant",
+            welcome_message,
+            session_id=st.session_state.session_id,
+            related_questions=[
+                "What can you help me with?",
+                "How do I use this application?",
+                "What metrics can I analyze?"
+            ],
+            attribution="Default welcome message",
+            drill_down_data="Welcome to the AI Assistant application"
+        ))
+    
+    # Display older messages as pre-rendered chunks without buttons, newest
+    # chunks only; earlier ones are loaded on request
+    history = st.session_state.chat_history
+    older_count = max(len(history) - RECENT_MESSAGES, 0)
+    if older_count:
+        starts = chunk_starts(older_count)
+        shown_starts = starts[-st.session_state.get("older_chunks_shown", OLDER_CHUNKS_SHOWN):]
+        if shown_starts[0] > 0:
+            st.button(f"Show earlier messages ({shown_starts[0]} hidden)", on_click=_show_earlier_messages)
+        with st.container(border=True):
+            for start in shown_starts:
+                chunk = history[start:min(start + CHUNK_SIZE, older_count)]
+                st.markdown(prerender_chunk(chunk_key(chunk), chunk))
     
-    # Display chat history
-    for message in st.session_state.chat_history:
+    # Display recent messages
+    for message in history[-RECENT_MESSAGES:]:
+        message_id, digest = render_key(message)
         with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+            st.markdown(prerender_message(message_id, digest, message["content"]))
             
             # If it's an assistant message, show additional features
             if message["role"] == "assistant" and "related_questions" in message:
@@ -135,63 +213,71 @@ def render_chat_interface():
                 for i, question in enumerate(message["related_questions"]):
                     if i < 3:  # Limit to 3 questions
                         with cols[i]:
-                            if st.button(question, key=f"related_{message['content'][:10]}_{i}"):
+                            if st.button(question, key=f"related_{message_id}_{i}"):
                                 # Add the related question to the chat
-                                st.session_state.chat_history.append({"role": "user", "content": question})
+                                st.session_state.chat_history.append(new_message("user", question, session_id=st.session_state.session_id))
                                 # Generate mock response
                                 mock_response = f"This is a response to your related question: {question}"
-                                st.session_state.chat_history.append({
-                                    "role": "assistant", 
-                                    "content": mock_response,
-                                    "related_questions": [
+                                st.session_state.chat_history.append(new_message(
+                                    "assistant",
+                                    mock_response,
+                                    session_id=st.session_state.session_id,
+                                    related_questions=[
                                         f"What about the {['impact', 'trends', 'details'][i % 3]} of this?",
                                         f"How does this relate to {['revenue', 'users', 'growth'][i % 3]}?",
                                         f"Can you {['explain', 'analyze', 'compare'][i % 3]} this further?"
                                     ],
-                                    "attribution": f"Based on mock data for '{question}'",
-                                    "drill_down_data": "Mock drill-down data would appear here"
-                                })
+                                    attribution=f"Based on mock data for '{question}'",
+                                    drill_down_data="Mock drill-down data would appear here"
+                                ))
                                 st.rerun()
                 
                 # Show attribution and drill-down buttons
                 col1, col2 = st.columns(2)
                 with col1:
-                    if st.button("Attribution Analysis", key=f"attr_{len(st.session_state.chat_history)}"):
-                        st.info(message.get("attribution", "No attribution data available"))
+                    if st.button("Attribution Analysis", key=f"attr_{message_id}"):
+                        st.info(escape_dollars(message.get("attribution", "No attribution data available")))
                         
                 with col2:
-                    if st.button("Data Drill-down", key=f"drill_{len(st.session_state.chat_history)}"):
-                        st.info(message.get("drill_down_data", "No drill-down data available"))
+                    if st.button("Data Drill-down", key=f"drill_{message_id}"):
+                        st.info(escape_dollars(message.get("drill_down_data", "No drill-down data available")))
 
     # Chat input
     if prompt := st.chat_input("What would you like to know?"):
         # Add user message to history
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
+        st.session_state.chat_history.append(new_message("user", prompt, session_id=st.session_state.session_id))
         logger.info(f"User message: {prompt}")
         
         # Display user message
         with st.chat_message("user"):
-            st.markdown(prompt)
+            st.markdown(sanitize_markdown(prompt))
             
         # Generate mock AI response
         with st.chat_message("assistant"):
-            # Simulate processing
-            response = f"I understand you're asking about '{prompt}'. This is a mock response from the AI assistant."
+            # Answer metric questions from metric data, otherwise simulate processing
+            metric_answer = _answer_metric_question(prompt)
+            if metric_answer:
+                response, attribution, drill_down_data = metric_answer
+            else:
+                response = f"I understand you're asking about '{prompt}'. This is a mock response from the AI assistant."
+                attribution = f"Based on mock analysis of '{prompt}'"
+                drill_down_data = "Mock data drill-down: Detailed analysis would appear here with charts and tables"
             
             # Add response to history with additional features
-            st.session_state.chat_history.append({
-                "role": "assistant", 
-                "content": response,
-                "related_questions": [
+            st.session_state.chat_history.append(new_message(
+                "assistant",
+                response,
+                session_id=st.session_state.session_id,
+                related_questions=[
                     f"What are the key factors affecting {prompt}?",
                     f"How has {prompt} changed over time?",
                     f"What are the implications of {prompt} for our business?"
                 ],
-                "attribution": f"Based on mock analysis of '{prompt}'",
-                "drill_down_data": "Mock data drill-down: Detailed analysis would appear here with charts and tables"
-            })
+                attribution=attribution,
+                drill_down_data=drill_down_data
+            ))
             
-            st.markdown(response)
+            st.markdown(sanitize_markdown(response))
             
             # Show related questions
             st.subheader("Related Questions:")
@@ -205,28 +291,44 @@ def render_chat_interface():
                     with cols[i]:
                         if st.button(question, key=f"related_new_{i}"):
                             # Add the related question to the chat
-                            st.session_state.chat_history.append({"role": "user", "content": question})
+                            st.session_state.chat_history.append(new_message("user", question, session_id=st.session_state.session_id))
                             # Generate mock response
                             mock_response = f"This is a response to your related question: {question}"
-                            st.session_state.chat_history.append({
-                                "role": "assistant", 
-                                "content": mock_response,
-                                "related_questions": [
+                            st.session_state.chat_history.append(new_message(
+                                "assistant",
+                                mock_response,
+                                session_id=st.session_state.session_id,
+                                related_questions=[
                                     f"What about the {['impact', 'trends', 'details'][i % 3]} of this?",
                                     f"How does this relate to {['revenue', 'users', 'growth'][i % 3]}?",
                                     f"Can you {['explain', 'analyze', 'compare'][i % 3]} this further?"
                                 ],
-                                "attribution": f"Based on mock data for '{question}'",
-                                "drill_down_data": "Mock drill-down data would appear here"
-                            })
+                                attribution=f"Based on mock data for '{question}'",
+                                drill_down_data="Mock drill-down data would appear here"
+                            ))
                             st.rerun()
 
+def _toggle_materialization(metric, toggle_key):
+    """
+    Register or unregister a metric with the metric store.
+    
+    Used as the toggle's on_change callback, so the store only changes when
+    a user flips the toggle, not when another session renders it.
+    """
+    store = get_metric_store()
+    if st.session_state[toggle_key]:
+        store.register(metric["name"], metric["aggregate"])
+    else:
+        store.unregister(metric["name"])
+    metric["materialized"] = st.session_state[toggle_key]
+
 def render_metrics_interface():
     """
     Render the metrics definition interface.
     
     This function displays:
     - Existing metrics in expandable sections
+    - Materialization toggle and status for metrics with an aggregate
     - Form for adding new metrics
     """
     logger.info("Rendering metrics interface")
@@ -240,7 +342,33 @@ def render_metrics_interface():
         with st.expander(metric["name"]):
             st.write(f"ID: {metric['id']}")
             st.write(f"Description: {metric['description']}")
-            st.code(f"SELECT * FROM metrics WHERE id = {metric['id']}; -- Mock SQL query", language="sql")
+            aggregate = metric.get("aggregate")
+            if not aggregate:
+                st.code(f"SELECT * FROM metrics WHERE id = {metric['id']}; -- Mock SQL query", language="sql")
+                continue
+            
+            columns = ", ".join(filter(None, [aggregate["numerator"], aggregate.get("denominator")]))
+            st.code(f"SELECT event_date, region, {columns} FROM events GROUP BY event_date, region;", language="sql")
+            
+            # Materialization is only offered for aggregates that can be rolled up
+            additive = is_additive(aggregate)
+            toggle_key = f"materialize_{metric['id']}"
+            st.session_state[toggle_key] = metric.get("materialized", False)
+            st.toggle(
+                "Precompute aggregates",
+                key=toggle_key,
+                on_change=_toggle_materialization,
+                args=(metric, toggle_key),
+                disabled=not additive,
+                help="Store aggregates by date and region, refreshed incrementally in the background" if additive
+                else "Only SUM and COUNT aggregates can be rolled up from precomputed aggregates"
+            )
+            if metric.get("materialized", False):
+                store = get_metric_store()
+                status = store.status(metric["name"])
+                if status is not None:
+                    freshness = "fresh" if status["fresh"] else "stale, queries run live"
+                    st.caption(f"Materialized up to event #{status['last_event_id']} ({freshness})")
     
     # Add new metric form
     st.subheader("Add New Metric")
@@ -248,15 +376,33 @@ def render_metrics_interface():
         metric_name = st.text_input("Metric Name")
         metric_description = st.text_area("Description")
         sample_sql = st.text_area("Sample SQL Query", placeholder="SELECT * FROM table WHERE condition;")
+        aggregate_expression = st.text_input("Aggregate Expression (optional)", placeholder="SUM(revenue)")
+        materialize = st.checkbox("Precompute aggregates")
         submitted = st.form_submit_button("Add Metric")
         
         if submitted:
-            if metric_name and metric_description and sample_sql:
+            if materialize and not aggregate_expression:
+                st.error("Please provide an aggregate expression to precompute")
+            elif materialize and not is_additive({"numerator": aggregate_expression}):
+                st.error("Only SUM and COUNT aggregates (without DISTINCT) can be precomputed")
+            elif metric_name and metric_description and sample_sql:
                 new_metric = {
                     "id": len(MOCK_DATA["metrics"]) + 1,
                     "name": metric_name,
                     "description": metric_description
                 }
+                if aggregate_expression:
+                    new_metric["aggregate"] = {"numerator": aggregate_expression}
+                    new_metric["materialized"] = materialize
+                    try:
+                        if materialize:
+                            get_metric_store().register(metric_name, new_metric["aggregate"])
+                        else:
+                            get_metric_store().validate(new_metric["aggregate"])
+                    except sqlite3.Error as e:
+                        st.error(f"Invalid aggregate expression: {e}")
+                        logger.warning(f"Invalid aggregate expression for metric {metric_name}: {e}")
+                        return
                 MOCK_DATA["metrics"].append(new_metric)
                 st.success(f"Added new metric: {metric_name}")
                 logger.info(f"New metric added: {metric_name}")
@@ -270,29 +416,63 @@ def render_history_interface():
     
     This function displays:
     - Chat history grouped by session
+    - Export of a session or date range to JSONL or Parquet
     - Clear history button
+    - Import of previously exported history
     """
     logger.info("Rendering history interface")
     st.title("Chat History")
     
     if st.session_state.chat_history:
-        # Group messages by date
+        # Group messages by the session they were created in
         grouped_history = {}
         for message in st.session_state.chat_history:
-            # For simplicity, we'll group by session (all messages together)
-            # In a real app, you might group by actual dates
-            date_key = "Current Session"
-            if date_key not in grouped_history:
-                grouped_history[date_key] = []
-            grouped_history[date_key].append(message)
+            session_id = message.get("session_id")
+            if session_id == st.session_state.session_id:
+                session_key = "Current Session"
+            elif session_id:
+                session_key = f"Session {session_id[:8]}"
+            else:
+                session_key = "Imported Messages"
+            if session_key not in grouped_history:
+                grouped_history[session_key] = []
+            grouped_history[session_key].append(message)
         
         # Display history
-        for date, messages in grouped_history.items():
-            with st.expander(date, expanded=True):
+        for session_key, messages in grouped_history.items():
+            with st.expander(session_key, expanded=True):
                 for message in messages:
                     role = message["role"]
                     content = message["content"]
-                    st.markdown(f"**{role.capitalize()}:** {content}")
+                    st.markdown(f"**{role.capitalize()}:** {escape_dollars(content)}")
+        
+        # Export history
+        st.subheader("Export History")
+        export_scope = st.radio("Export:", ["Current Session", "Date Range", "All History"], horizontal=True)
+        session_id = st.session_state.session_id if export_scope == "Current Session" else None
+        start_date = end_date = None
+        if export_scope == "Date Range":
+            date_range = st.date_input("Date range:", value=())
+            if len(date_range) == 2:
+                start_date, end_date = date_range
+        export_format = st.selectbox("Format:", list(EXPORT_FORMATS))
+        
+        # Serialize only on request, so reruns don't rebuild the export
+        if st.button("Prepare Export"):
+            if export_scope == "Date Range" and start_date is None:
+                st.error("Please select a start and end date")
+            else:
+                messages = iter_messages(st.session_state.chat_history, session_id, start_date, end_date)
+                extension, mime_type = EXPORT_FORMATS[export_format]
+                st.download_button(
+                    "Download Export",
+                    data=write_export(messages, export_format),
+                    file_name=f"chat_history.{extension}",
+                    mime=mime_type,
+                    # Downloading must not rerun the app, which would hide the button
+                    on_click="ignore"
+                )
+                logger.info(f"Chat history exported as {export_format}")
                     
         # Clear history button
         if st.button("Clear Chat History"):
@@ -302,3 +482,26 @@ def render_history_interface():
             st.rerun()
     else:
         st.info("No chat history yet. Start a conversation!")
+    
+    # Import history
+    st.subheader("Import History")
+    if "import_result" in st.session_state:
+        st.success(st.session_state.pop("import_result"))
+    with st.form("import_history_form", clear_on_submit=True):
+        uploaded_file = st.file_uploader("History file:", type=[extension for extension, _ in EXPORT_FORMATS.values()])
+        submitted = st.form_submit_button("Import")
+        
+        if submitted:
+            if uploaded_file is not None:
+                import_format = "Parquet" if uploaded_file.name.endswith(".parquet") else "JSONL"
+                try:
+                    imported, skipped = import_history(uploaded_file, import_format, st.session_state.chat_history)
+                except Exception as e:
+                    st.error(f"Could not read {uploaded_file.name}: {e}")
+                    logger.error(f"History import failed: {e}")
+                else:
+                    st.session_state.import_result = f"Imported {imported} messages ({skipped} skipped)"
+                    # Rerun so the history above the form includes the imported messages
+                    st.rerun()
+            else:
+                st.error("Please choose a file to import")
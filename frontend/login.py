@@ -5,6 +5,7 @@ Handles user authentication and login page rendering.
 
 import streamlit as st
 import logging
+import uuid
 
 # Get the logger from the main app
 logger = logging.getLogger(__name__)
@@ -31,6 +32,7 @@ def login_page():
             if username and password:
                 st.session_state.logged_in = True
                 st.session_state.current_user = username
+                st.session_state.session_id = uuid.uuid4().hex
                 logger.info(f"User {username} logged in successfully")
                 st.rerun()
             else:
@@ -0,0 +1,111 @@
+"""
+Render cache module for the AI Assistant application.
+Pre-processes chat message markdown once and reuses it across reruns.
+"""
+
+import re
+import hashlib
+import streamlit as st
+
+# Role labels used when older messages are coalesced into chunks
+ROLE_LABELS = {"user": "You", "assistant": "Assistant"}
+
+# Number of older messages coalesced into each pre-rendered block
+CHUNK_SIZE = 50
+
+# Control characters other than tab and newline, which break layout
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+
+# Lines opening or closing a fenced code block
+CODE_FENCE = re.compile(r"^\s*(```|~~~)", re.MULTILINE)
+
+# Fenced code blocks and inline code spans, in which "$" is shown as is
+CODE_SPANS = re.compile(r"^[ \t]*(```|~~~).*?^[ \t]*\1[^\n]*$|`[^`\n]+`", re.MULTILINE | re.DOTALL)
+
+# Dollar signs not already escaped
+DOLLAR = re.compile(r"(?<!\\)\$")
+
+def content_hash(content):
+    """
+    Return a short, stable hash of a message's content.
+    """
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+def render_key(message):
+    """
+    Return the (message ID, content hash) pair identifying a rendered message.
+
+    Messages without an ID fall back to their content hash, so identical
+    content shares one cache entry.
+    """
+    digest = content_hash(message["content"])
+    return message.get("id") or digest, digest
+
+def escape_dollars(text):
+    """
+    Escape "$" outside of code so Streamlit markdown shows it literally.
+
+    Streamlit renders text between two dollar signs as LaTeX, which garbles
+    amounts such as "$2M to $3M". Messages are stored as plain text and
+    escaped only when rendered.
+    """
+    parts = []
+    position = 0
+    for match in CODE_SPANS.finditer(text):
+        parts.append(DOLLAR.sub(r"\\$", text[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(DOLLAR.sub(r"\\$", text[position:]))
+    return "".join(parts)
+
+def sanitize_markdown(content):
+    """
+    Normalize message markdown so it renders the same on its own or coalesced.
+
+    Line endings are normalized, control characters removed, and an
+    unterminated code fence is closed so it cannot swallow the messages
+    that follow it in a coalesced block. Dollar signs are escaped.
+    """
+    markdown = CONTROL_CHARS.sub("", content.replace("\r\n", "\n").replace("\r", "\n")).strip()
+    if len(CODE_FENCE.findall(markdown)) % 2:
+        markdown += "\n```"
+    return escape_dollars(markdown)
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def prerender_message(message_id, digest, _content):
+    """
+    Return the sanitized markdown of a single message.
+
+    The cache key is the message ID and content hash; the content itself
+    is excluded from hashing (leading underscore) since the digest
+    already identifies it.
+    """
+    return sanitize_markdown(_content)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def prerender_chunk(message_ids, _messages):
+    """
+    Return one markdown block containing a chunk of consecutive messages.
+
+    The cache key is the tuple of the chunk's message IDs; messages are
+    never edited after creation, so their content is not hashed. Callers
+    align chunks to fixed history positions (see chunk_starts), so a chunk
+    only changes while it is the newest one and filling up.
+    """
+    blocks = []
+    for message in _messages:
+        label = ROLE_LABELS.get(message["role"], message["role"].capitalize())
+        blocks.append(f"**{label}:**\n\n{sanitize_markdown(message['content'])}")
+    return "\n\n---\n\n".join(blocks)
+
+def chunk_starts(count, chunk_size=CHUNK_SIZE):
+    """
+    Return the start index of every chunk covering the first count messages.
+    """
+    return range(0, count, chunk_size)
+
+def chunk_key(messages):
+    """
+    Return the cache key of a chunk: the IDs of its messages.
+    """
+    return tuple(message.get("id") or content_hash(message["content"]) for message in messages)
@@ -6,26 +6,43 @@ This file orchestrates the application flow and imports UI components from the f
 import streamlit as st
 import logging
 import os
-from dotenv import load_dotenv
 
 # Import frontend components
 from frontend.login import login_page
 from frontend.interface import render_sidebar, render_chat_interface, render_metrics_interface, render_history_interface
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(message)s',
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+@st.cache_resource(show_spinner=False)
+def initialize_app():
+    """
+    Perform one-time, process-wide initialization.
+    
+    Streamlit re-executes this script on every rerun, so loading the .env
+    file and configuring logging here would otherwise be repeated (and a
+    new handle to app.log opened) on each interaction. st.cache_resource
+    runs the body once per server process and shares it across sessions.
+    """
+    # Imported here so the import is only paid on the first run
+    from dotenv import load_dotenv
+    
+    # Load environment variables
+    load_dotenv()
+    
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[
+            logging.FileHandler("app.log"),
+            logging.StreamHandler()
+        ]
+    )
+    logger.info("Application initialized")
+    return True
+
+initialize_app()
+
 # Mock API key for local testing
 MOCK_API_KEY = "sk-mock-api-key-for-local-testing"
 
@@ -36,6 +53,9 @@ if 'logged_in' not in st.session_state:
 if 'current_user' not in st.session_state:
     st.session_state.current_user = None
     
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = None
+    
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
     
@@ -48,30 +68,40 @@ if 'selected_language' not in st.session_state:
 if 'api_key' not in st.session_state:
     st.session_state.api_key = os.getenv("OPENAI_API_KEY", MOCK_API_KEY)
 
+def build_pages():
+    """
+    Build the pages of the main application.
+    
+    Each view is registered as an st.Page so that st.navigation renders the
+    page menu in the sidebar and only the selected page's function runs on
+    a rerun. Switching pages therefore takes exactly one rerun.
+    """
+    return [
+        st.Page(render_chat_interface, title="Chat Interface", icon=":material/chat:", url_path="chat", default=True),
+        st.Page(render_metrics_interface, title="Metrics Definition", icon=":material/query_stats:", url_path="metrics"),
+        st.Page(render_history_interface, title="History", icon=":material/history:", url_path="history"),
+    ]
+
 def main_app():
     """
     Render the main application interface.
     
     This function orchestrates the main app by:
-    1. Rendering the sidebar
-    2. Determining which view to display based on session state
-    3. Calling the appropriate render function for the selected view
+    1. Registering the views with st.navigation
+    2. Rendering the sidebar as a fragment
+    3. Running only the page selected in the navigation menu
     """
     logger.info("Rendering main application interface")
     
-    # Render the sidebar
-    render_sidebar()
+    # Register the pages; the navigation menu is drawn in the sidebar
+    page = st.navigation(build_pages(), position="sidebar")
     
-    # Main content area
-    if 'current_view' not in st.session_state:
-        st.session_state.current_view = "chat"
+    # Render the sidebar below the navigation menu
+    with st.sidebar:
+        render_sidebar()
         
-    if st.session_state.current_view == "chat":
-        render_chat_interface()
-    elif st.session_state.current_view == "metrics":
-        render_metrics_interface()
-    elif st.session_state.current_view == "history":
-        render_history_interface()
+    # Main content area
+    page.run()
 
 def main():
     """
@@ -84,6 +114,10 @@ def main():
     
     # Check if user is logged in
     if not st.session_state.logged_in:
+        # The real pages are registered so that a refresh or deep link keeps
+        # a valid URL; the login page is shown in place of the requested
+        # page, which then runs after login
+        st.navigation(build_pages(), position="hidden")
         login_page()
     else:
         main_app()
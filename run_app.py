@@ -8,6 +8,10 @@ import os
 import sys
 import subprocess
 import logging
+import importlib.util
+
+# Packages the application needs at runtime, keyed by their import name
+REQUIRED_PACKAGES = ["streamlit", "openai", "pandas", "dotenv"]
 
 def setup_logging():
     """
@@ -34,16 +38,16 @@ def check_dependencies():
     This function verifies that all required Python packages are available
     before attempting to run the application. This helps prevent runtime
     errors due to missing dependencies.
+    
+    Packages are located with importlib.util.find_spec instead of being
+    imported, so the probe does not pay the import cost of streamlit,
+    openai and pandas only for the Streamlit subprocess to pay it again.
     """
-    try:
-        import streamlit
-        import openai
-        import pandas
-        import dotenv
-        return True
-    except ImportError as e:
-        logger.error(f"Missing required dependency: {e}")
-        return False
+    missing_packages = [package for package in REQUIRED_PACKAGES
+                        if importlib.util.find_spec(package) is None]
+    for package in missing_packages:
+        logger.error(f"Missing required dependency: {package}")
+    return len(missing_packages) == 0
 
 def load_environment():
     """
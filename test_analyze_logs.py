@@ -0,0 +1,81 @@
+"""
+Tests for the rerun attribution of analyze_logs.py.
+Run with: python -m pytest test_analyze_logs.py
+"""
+
+from analyze_logs import LogAnalyzer, analyze_file
+
+def feed(analyzer, time, message):
+    """
+    Feed one line in main.py's log format, logged on a fixed day.
+    """
+    line = f"2025-10-22 {time} INFO {message}".encode("utf-8")
+    analyzer.feed(line, message.encode("utf-8"))
+
+def full_rerun(analyzer, time, view, *events):
+    """
+    Feed the lines of a full rerun of the logged-in app.
+    """
+    feed(analyzer, time, "Starting AI Assistant application")
+    feed(analyzer, time, "Rendering main application interface")
+    feed(analyzer, time, "Rendering sidebar")
+    feed(analyzer, time, f"Rendering {view} interface")
+    for event in events:
+        feed(analyzer, time, event)
+
+def test_login_fragment_event_and_logout():
+    analyzer = LogAnalyzer(keep_sessions=True)
+
+    # Login, and the st.rerun() it issues
+    feed(analyzer, "21:00:05,000", "Starting AI Assistant application")
+    feed(analyzer, "21:00:05,001", "Rendering login page")
+    feed(analyzer, "21:00:05,002", "User bob logged in successfully")
+    full_rerun(analyzer, "21:00:05,030", "chat")
+
+    # API key updated in the sidebar fragment
+    feed(analyzer, "21:00:30,000", "Rendering sidebar")
+    feed(analyzer, "21:00:30,001", "API key updated")
+
+    # Logout in the sidebar fragment, and the full rerun it issues
+    feed(analyzer, "21:00:40,000", "Rendering sidebar")
+    feed(analyzer, "21:00:40,001", "User logged out")
+    feed(analyzer, "21:00:40,030", "Starting AI Assistant application")
+    feed(analyzer, "21:00:40,031", "Rendering login page")
+    analyzer.finish()
+
+    report = analyzer.report()
+    triggers = {row["widget"]: (row["reruns"], row["redundant"]) for row in report["triggers"]}
+    assert triggers == {"Login": (2, 1), "Logout": (1, 1)}
+    assert report["redundant_reruns"] == 2
+    assert [(row["from"], row["to"]) for row in report["view_switches"]] == [("login", "chat"), ("chat", "login")]
+
+    [session] = report["session_details"]
+    assert session["user"] == "bob"
+    assert session["reruns"] == 3
+    assert session["fragment_reruns"] == 2
+    assert session["duration_s"] == 35.0
+
+def test_chat_input_after_fragment_is_not_redundant():
+    analyzer = LogAnalyzer()
+    feed(analyzer, "21:00:05,000", "Starting AI Assistant application")
+    feed(analyzer, "21:00:05,001", "Rendering login page")
+    feed(analyzer, "21:00:05,002", "User bob logged in successfully")
+    full_rerun(analyzer, "21:00:05,030", "chat")
+    feed(analyzer, "21:00:10,000", "Rendering sidebar")
+    full_rerun(analyzer, "21:00:20,000", "chat", "User message: hello")
+    analyzer.finish()
+
+    triggers = {row["widget"]: (row["reruns"], row["redundant"]) for row in analyzer.report()["triggers"]}
+    assert triggers == {"Login": (2, 1), "Chat input": (1, 0)}
+
+def test_analyze_file_skips_run_app_and_truncated_lines(tmp_path):
+    log_file = tmp_path / "app.log"
+    log_file.write_bytes(
+        b"2025-10-22 21:00:00,000 - __main__ - INFO - Starting AI Assistant application\n"
+        b"2025-10-22 21:00:01,000 INFO Starting AI Assistant application\n"
+        b"2025-10-22 21:00:01,001 INFO Rendering login page\n"
+        b"2025-10-22 21:16:43,579 - foo"
+    )
+    report = analyze_file(str(log_file)).report()
+    assert report["lines"] == 4
+    assert report["reruns"] == 1
@@ -63,7 +63,7 @@ def test_app():
     st.subheader("Test 4: Session State Initialization Test")
     try:
         # Initialize session state variables if not present
-        session_vars = ['logged_in', 'current_user', 'chat_history', 'selected_model', 'selected_language', 'api_key']
+        session_vars = ['logged_in', 'current_user', 'session_id', 'chat_history', 'selected_model', 'selected_language', 'api_key']
         initialized_vars = []
         missing_vars = []
         
@@ -8,6 +8,7 @@ import os
 import sys
 import subprocess
 import logging
+import importlib.util
 
 def setup_logging():
     """
@@ -46,8 +47,13 @@ def check_required_files():
         ".dockerignore",
         "run_app.py",
         "verify_setup.py",
+        "bench_startup.py",
+        "analyze_logs.py",
         "frontend/login.py",
-        "frontend/interface.py"
+        "frontend/interface.py",
+        "frontend/history_io.py",
+        "frontend/render_cache.py",
+        "backend/materialized.py"
     ]
     
     missing_files = []
@@ -65,7 +71,8 @@ def check_dependencies():
     Check if required dependencies are installed.
     
     This function verifies that all required Python packages are available
-    for the application to run properly.
+    for the application to run properly. Packages are located without
+    importing them so the check stays fast.
     """
     required_packages = [
         "streamlit",
@@ -77,10 +84,9 @@ def check_dependencies():
     
     missing_packages = []
     for package in required_packages:
-        try:
-            __import__(package)
+        if importlib.util.find_spec(package) is not None:
             logger.info(f"Found required package: {package}")
-        except ImportError:
+        else:
             missing_packages.append(package)
             logger.error(f"Missing required package: {package}")
     